@@ -4,7 +4,7 @@
 
 from functools import lru_cache
 
-from pydantic import ValidationInfo, field_validator
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -21,42 +21,17 @@ class Settings(BaseSettings):
     bot_token: str
 
     # Download settings
-    max_file_size_mb: int = 50
-    download_timeout: int = 300  # seconds
+    max_file_size_mb: int = Field(default=50, gt=0, le=50)  # Telegram API limit
+    download_timeout: float = Field(default=300, gt=0, le=600)  # seconds
+    max_concurrent_downloads: int = Field(default=4, gt=0)
     temp_dir: str = "/tmp/yt-downloader-bot"  # noqa: S108
 
     # Cookies file for platforms requiring authentication (e.g. Instagram)
     cookies_file: str | None = None
 
     # Rate limiting
-    rate_limit_requests: int = 5
-    rate_limit_window: int = 60  # seconds
-
-    @field_validator(
-        "max_file_size_mb",
-        "download_timeout",
-        "rate_limit_requests",
-        "rate_limit_window",
-    )
-    @classmethod
-    def validate_positive(cls, v: int, info: ValidationInfo) -> int:
-        if v <= 0:
-            raise ValueError(f"{info.field_name} must be positive")
-        return v
-
-    @field_validator("max_file_size_mb")
-    @classmethod
-    def validate_max_file_size(cls, v: int) -> int:
-        if v > 50:
-            raise ValueError("max_file_size_mb cannot exceed 50 (Telegram API limit)")
-        return v
-
-    @field_validator("download_timeout")
-    @classmethod
-    def validate_download_timeout(cls, v: int) -> int:
-        if v > 600:
-            raise ValueError("download_timeout cannot exceed 600 seconds")
-        return v
+    rate_limit_requests: int = Field(default=5, gt=0)
+    rate_limit_window: int = Field(default=60, gt=0)  # seconds
 
     @property
     def max_file_size_bytes(self) -> int:
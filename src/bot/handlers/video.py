@@ -3,7 +3,6 @@
 """Video download handlers."""
 
 import logging
-import re
 from contextlib import suppress
 
 from aiogram import F, Router
@@ -20,12 +19,18 @@ from bot.services import (
     VideoDownloader,
     VideoUnavailableError,
 )
-from bot.validators import ValidationResult, validate_url
+from bot.validators import Platform, ValidationResult, validate_url
 
 logger = logging.getLogger(__name__)
 
 router = Router(name="video")
 
+# (user_id, url) pairs with a download in progress
+_active_downloads: set[tuple[int, str]] = set()
+
+# Characters not allowed in filenames: <>:"/\|?* and ASCII control codes
+_UNSAFE_CHARS_TABLE = str.maketrans("", "", '<>:"/\\|?*' + "".join(map(chr, range(0x20))))
+
 
 @router.message(CommandStart())
 async def handle_start(message: Message) -> None:
@@ -83,6 +88,14 @@ async def handle_video_url(
         await message.answer(f"Invalid URL: {validation.error_message}")
         return
 
+    # Ignore repeats of a URL this user is already downloading (before the rate
+    # limit, so a double-tap does not cost a request)
+    download_url = validation.sanitized_url or url
+    inflight_key = (user_id, download_url)
+    if inflight_key in _active_downloads:
+        await message.answer("This video is already being downloaded. Please wait.")
+        return
+
     # Check rate limit
     try:
         rate_limiter.check_rate_limit(user_id)
@@ -92,16 +105,31 @@ async def handle_video_url(
         )
         return
 
+    _active_downloads.add(inflight_key)
+    try:
+        await _download_and_send(message, downloader, download_url, validation.platform, user_id)
+    finally:
+        _active_downloads.discard(inflight_key)
+
+
+async def _download_and_send(
+    message: Message,
+    downloader: VideoDownloader,
+    url: str,
+    platform: Platform,
+    user_id: int,
+) -> None:
+    """Download the video and reply with it, reporting failures in the status message."""
     # Send processing message
     processing_msg = await message.answer(
-        f"Downloading video from {validation.platform.value}... Please wait."
+        f"Downloading video from {platform.value}... Please wait."
     )
 
     # Download video
     result: DownloadResult | None = None
 
     try:
-        result = await downloader.download(validation.sanitized_url or url)
+        result = await downloader.download(url)
 
         # Send video with sanitized filename
         safe_filename = _sanitize_filename(result.title)
@@ -121,15 +149,14 @@ async def handle_video_url(
             "Video sent successfully",
             extra={
                 "user_id": user_id,
-                "platform": validation.platform.value,
+                "platform": platform.value,
                 "file_size": result.file_size,
             },
         )
 
     except FileTooLargeError as e:
         await processing_msg.edit_text(
-            f"Video is too large ({e.file_size // 1024 // 1024}MB). "
-            f"Maximum allowed size is {e.max_size // 1024 // 1024}MB."
+            f"Video is too large ({e.file_size_mb}MB). Maximum allowed size is {e.max_size_mb}MB."
         )
         logger.warning(
             "File too large",
@@ -167,8 +194,9 @@ async def handle_video_url(
 
 def _sanitize_filename(title: str, max_length: int = 50) -> str:
     """Sanitize title for use as filename."""
-    safe_title = re.sub(r'[<>:"/\\|?*\x00-\x1f]', "", title)
-    safe_title = re.sub(r"[\s_]+", " ", safe_title).strip()
+    safe_title = title.translate(_UNSAFE_CHARS_TABLE)
+    # Collapse runs of whitespace/underscores into single spaces
+    safe_title = " ".join(safe_title.replace("_", " ").split())
     if len(safe_title) > max_length:
         safe_title = safe_title[:max_length].rsplit(" ", 1)[0]
     return safe_title or "video"
@@ -11,7 +11,7 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from pydantic import ValidationError
 
-from bot.config import get_settings
+from bot.config import Settings, get_settings
 from bot.handlers import video_router
 from bot.services import RateLimiter, VideoDownloader
 
@@ -25,18 +25,24 @@ def setup_logging() -> None:
     )
 
 
-async def main() -> None:
-    """Run the bot."""
+async def main(settings: Settings | None = None) -> None:
+    """
+    Run the bot.
+
+    Args:
+        settings: Settings to run with. Loaded from the environment if omitted.
+    """
     setup_logging()
     logger = logging.getLogger(__name__)
 
     # Load settings
-    try:
-        settings = get_settings()
-    except ValidationError as e:
-        logger.error("Failed to load settings: %s", e)
-        logger.error("Make sure BOT_TOKEN is set in environment or .env file")
-        sys.exit(1)
+    if settings is None:
+        try:
+            settings = get_settings()
+        except ValidationError as e:
+            logger.error("Failed to load settings: %s", e)
+            logger.error("Make sure BOT_TOKEN is set in environment or .env file")
+            sys.exit(1)
 
     # Create services
     downloader = VideoDownloader(
@@ -44,6 +50,7 @@ async def main() -> None:
         max_file_size=settings.max_file_size_bytes,
         timeout=settings.download_timeout,
         cookies_file=settings.cookies_file,
+        max_concurrent=settings.max_concurrent_downloads,
     )
     rate_limiter = RateLimiter(
         max_requests=settings.rate_limit_requests,
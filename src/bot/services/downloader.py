@@ -3,7 +3,8 @@
 """Video downloading service using yt-dlp."""
 
 import asyncio
-import uuid
+import os
+import shutil
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
@@ -21,10 +22,9 @@ class FileTooLargeError(DownloadError):
     def __init__(self, file_size: int, max_size: int):
         self.file_size = file_size
         self.max_size = max_size
-        super().__init__(
-            f"File size ({file_size // 1024 // 1024}MB) "
-            f"exceeds limit ({max_size // 1024 // 1024}MB)"
-        )
+        self.file_size_mb = file_size // 1024 // 1024
+        self.max_size_mb = max_size // 1024 // 1024
+        super().__init__(f"File size ({self.file_size_mb}MB) exceeds limit ({self.max_size_mb}MB)")
 
 
 class VideoUnavailableError(DownloadError):
@@ -48,13 +48,20 @@ class VideoDownloader:
         self,
         temp_dir: str = "/tmp/yt-downloader-bot",  # noqa: S108
         max_file_size: int = 50 * 1024 * 1024,
-        timeout: int = 300,
+        timeout: float = 300,
         cookies_file: str | None = None,
+        max_concurrent: int = 4,
     ):
+        if max_concurrent <= 0:
+            raise ValueError("max_concurrent must be positive")
+
         self._temp_dir = Path(temp_dir)
         self._max_file_size = max_file_size
         self._timeout = timeout
         self._cookies_file = cookies_file
+        # Bounds running yt-dlp worker threads; extra downloads wait their turn
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._base_options = self._build_base_options()
         self._temp_dir.mkdir(parents=True, exist_ok=True)
 
     @property
@@ -65,8 +72,8 @@ class VideoDownloader:
     def max_file_size(self) -> int:
         return self._max_file_size
 
-    def _get_yt_dlp_options(self, output_path: str) -> dict[str, Any]:
-        """Get yt-dlp options for downloading."""
+    def _build_base_options(self) -> dict[str, Any]:
+        """Build yt-dlp options shared by all downloads (everything but ``outtmpl``)."""
         max_size_mb = self._max_file_size // 1024 // 1024
         format_str = (
             f"best[ext=mp4][filesize<{max_size_mb}M]/"
@@ -76,7 +83,6 @@ class VideoDownloader:
         )
         options: dict[str, Any] = {
             "format": format_str,
-            "outtmpl": output_path,
             "restrictfilenames": True,
             "noplaylist": True,
             "quiet": True,
@@ -84,11 +90,24 @@ class VideoDownloader:
             "extract_flat": False,
             "max_downloads": 1,
             "socket_timeout": 30,
+            "progress_hooks": [self._check_download_size],
         }
         if self._cookies_file:
             options["cookiefile"] = self._cookies_file
         return options
 
+    def _check_download_size(self, progress: dict[str, Any]) -> None:
+        """yt-dlp progress hook: abort as soon as the file is known to exceed the limit."""
+        if progress.get("status") != "downloading":
+            return
+        size = progress.get("total_bytes") or progress.get("downloaded_bytes") or 0
+        if size > self._max_file_size:
+            raise FileTooLargeError(size, self._max_file_size)
+
+    def _get_yt_dlp_options(self, output_path: str) -> dict[str, Any]:
+        """Get yt-dlp options for a single download."""
+        return {**self._base_options, "outtmpl": output_path}
+
     async def download(self, url: str) -> DownloadResult:
         """
         Download video from URL.
@@ -104,38 +123,46 @@ class VideoDownloader:
             VideoUnavailableError: If video is unavailable.
             DownloadError: If download fails.
         """
-        unique_id = uuid.uuid4().hex[:8]
-        output_path = str(self._temp_dir / f"video_{unique_id}.%(ext)s")
-        options = self._get_yt_dlp_options(output_path)
+        download_dir: Path | None = None
+        result: DownloadResult | None = None
+        worker: asyncio.Future[dict[str, Any] | None] | None = None
 
         try:
+            download_dir = self._create_download_dir()
+            options = self._get_yt_dlp_options(str(download_dir / "video.%(ext)s"))
+
+            # Waiting for a free slot does not count towards the download timeout.
+            # A yt-dlp thread cannot be interrupted, so on timeout it keeps running:
+            # the slot is released only when the thread itself finishes.
+            await self._semaphore.acquire()
+            worker = asyncio.ensure_future(asyncio.to_thread(self._extract_info, options, url))
+            worker.add_done_callback(self._release_slot)
             async with asyncio.timeout(self._timeout):
-                with yt_dlp.YoutubeDL(options) as ydl:
-                    info = await asyncio.to_thread(ydl.extract_info, url, download=True)
+                info = await asyncio.shield(worker)
 
             if info is None:
                 raise VideoUnavailableError("Could not download video")
 
-            downloaded_file = self._find_downloaded_file(unique_id)
+            downloaded_file = self._find_downloaded_file(download_dir, info)
             if downloaded_file is None:
                 raise DownloadError("Downloaded file not found")
 
             file_size = downloaded_file.stat().st_size
             if file_size > self._max_file_size:
-                downloaded_file.unlink(missing_ok=True)
                 raise FileTooLargeError(file_size, self._max_file_size)
 
-            return DownloadResult(
+            result = DownloadResult(
                 file_path=downloaded_file,
                 title=info.get("title", "Unknown"),
                 duration=info.get("duration"),
                 file_size=file_size,
             )
+            return result
 
         except TimeoutError as e:
-            self._cleanup_partial_download(unique_id)
-            raise DownloadError(f"Download timed out after {self._timeout} seconds") from e
-        except FileTooLargeError, VideoUnavailableError, DownloadError:
+            raise DownloadError(f"Download timed out after {self._timeout:g} seconds") from e
+        except DownloadError:
+            # Our own errors (FileTooLargeError, VideoUnavailableError) propagate as-is
             raise
         except yt_dlp.utils.DownloadError as e:
             error_msg = str(e).lower()
@@ -144,23 +171,70 @@ class VideoDownloader:
             raise DownloadError(f"Download failed: {e}") from e
         except Exception as e:
             raise DownloadError(f"Unexpected error during download: {e}") from e
+        finally:
+            # On any failure drop whatever was written, including partial files
+            if result is None and download_dir is not None:
+                if worker is not None and not worker.done():
+                    # Still writing; clean up once the thread is done with the directory
+                    partial_dir = download_dir
+                    worker.add_done_callback(lambda _: self._cleanup_partial_download(partial_dir))
+                else:
+                    self._cleanup_partial_download(download_dir)
+
+    _MAX_DIR_ATTEMPTS = 3
+
+    def _create_download_dir(self) -> Path:
+        """Create a fresh directory for one download, so lookup and cleanup never scan temp_dir."""
+        for _ in range(self._MAX_DIR_ATTEMPTS):
+            download_dir = self._temp_dir / os.urandom(4).hex()
+            try:
+                download_dir.mkdir(parents=True)
+            except FileExistsError:
+                # Never share a directory: cleanup of one download would delete the other
+                continue
+            return download_dir
+        raise DownloadError("Could not create a unique download directory")
+
+    @staticmethod
+    def _extract_info(options: dict[str, Any], url: str) -> dict[str, Any] | None:
+        """Run yt-dlp for a single download (blocking; called in a worker thread)."""
+        with yt_dlp.YoutubeDL(options) as ydl:
+            info: dict[str, Any] | None = ydl.extract_info(url, download=True)
+            return info
+
+    def _release_slot(self, worker: asyncio.Future[dict[str, Any] | None]) -> None:
+        """Free the download slot once the worker thread has finished."""
+        self._semaphore.release()
+        if not worker.cancelled():
+            # Mark the outcome as retrieved; after a timeout nobody awaits it
+            worker.exception()
 
     _TEMP_EXTENSIONS = frozenset({".part", ".ytdl", ".temp"})
 
-    def _find_downloaded_file(self, unique_id: str) -> Path | None:
-        """Find downloaded file by unique ID prefix, skipping temp files."""
-        matches = [
-            f
-            for f in self._temp_dir.glob(f"video_{unique_id}.*")
-            if f.suffix not in self._TEMP_EXTENSIONS
-        ]
-        return matches[0] if matches else None
-
-    def _cleanup_partial_download(self, unique_id: str) -> None:
+    def _find_downloaded_file(self, download_dir: Path, info: dict[str, Any]) -> Path | None:
+        """Find the downloaded file in its download directory."""
+        expected = download_dir / f"video.{info.get('ext', 'mp4')}"
+        if expected.is_file():
+            return expected
+
+        # Post-processing may change the extension; the directory holds only this download.
+        # scandir's DirEntry caches the file type, so there is no extra stat per entry.
+        with os.scandir(download_dir) as entries:
+            for entry in entries:
+                if (
+                    entry.name.startswith("video.")
+                    and os.path.splitext(entry.name)[1] not in self._TEMP_EXTENSIONS
+                    and entry.is_file(follow_symlinks=False)
+                ):
+                    return Path(entry.path)
+        return None
+
+    def _cleanup_partial_download(self, download_dir: Path) -> None:
         """Clean up partial download files."""
-        for file in self._temp_dir.glob(f"video_{unique_id}.*"):
-            file.unlink(missing_ok=True)
+        shutil.rmtree(download_dir, ignore_errors=True)
 
     def cleanup_file(self, file_path: Path) -> None:
-        """Clean up downloaded file."""
+        """Clean up downloaded file and its download directory."""
         file_path.unlink(missing_ok=True)
+        if file_path.parent.parent == self._temp_dir:
+            shutil.rmtree(file_path.parent, ignore_errors=True)
@@ -2,7 +2,10 @@
 
 """Rate limiting service for anti-abuse protection."""
 
+import math
 import time
+from collections import OrderedDict
+from collections.abc import Callable
 
 
 class RateLimitExceeded(Exception):
@@ -15,14 +18,21 @@ class RateLimitExceeded(Exception):
 
 class RateLimiter:
     """
-    In-memory rate limiter using sliding window algorithm.
+    In-memory rate limiter using token bucket algorithm.
 
+    Each user gets a bucket of ``max_requests`` tokens that refills at
+    ``max_requests / window_seconds`` tokens per second; every request takes one token.
     Includes automatic cleanup of stale user records to prevent memory leaks.
     """
 
     _CLEANUP_THRESHOLD_WINDOWS = 10
 
-    def __init__(self, max_requests: int, window_seconds: int):
+    def __init__(
+        self,
+        max_requests: int,
+        window_seconds: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
         if max_requests <= 0:
             raise ValueError("max_requests must be positive")
         if window_seconds <= 0:
@@ -30,8 +40,11 @@ class RateLimiter:
 
         self._max_requests = max_requests
         self._window_seconds = window_seconds
-        self._user_logs: dict[int, list[float]] = {}
-        self._last_cleanup = time.time()
+        self._clock = clock
+        self._refill_rate = max_requests / window_seconds  # tokens per second
+        # user_id -> (tokens, last_refill), least recently active first
+        self._buckets: OrderedDict[int, tuple[float, float]] = OrderedDict()
+        self._last_cleanup: float = clock()
 
     @property
     def max_requests(self) -> int:
@@ -48,24 +61,25 @@ class RateLimiter:
         Raises:
             RateLimitExceeded: If rate limit is exceeded.
         """
-        current_time = time.time()
+        current_time = self._clock()
 
         self._maybe_cleanup(current_time)
 
-        if user_id not in self._user_logs:
-            self._user_logs[user_id] = []
-        timestamps = self._user_logs[user_id]
+        tokens, last_refill = self._buckets.get(user_id, (self._max_requests, current_time))
+        elapsed = current_time - last_refill
+        tokens = min(self._max_requests, tokens + elapsed * self._refill_rate)
 
-        # Sliding window: keep only timestamps within the window
-        cutoff_time = current_time - self._window_seconds
-        timestamps[:] = [ts for ts in timestamps if ts > cutoff_time]
-
-        if len(timestamps) >= self._max_requests:
-            oldest_timestamp = timestamps[0]
-            retry_after = int(oldest_timestamp + self._window_seconds - current_time) + 1
+        if tokens < 1:
+            self._touch(user_id, tokens, current_time)
+            retry_after = math.ceil((1 - tokens) / self._refill_rate)
             raise RateLimitExceeded(retry_after=max(1, retry_after))
 
-        timestamps.append(current_time)
+        self._touch(user_id, tokens - 1, current_time)
+
+    def _touch(self, user_id: int, tokens: float, current_time: float) -> None:
+        """Store the user's bucket and mark it as most recently active."""
+        self._buckets[user_id] = (tokens, current_time)
+        self._buckets.move_to_end(user_id)
 
     def _maybe_cleanup(self, current_time: float) -> None:
         """Remove users with no recent activity to prevent memory leaks."""
@@ -76,10 +90,10 @@ class RateLimiter:
         self._last_cleanup = current_time
         cutoff_time = current_time - cleanup_interval
 
-        users_to_remove = [
-            user_id
-            for user_id, timestamps in self._user_logs.items()
-            if not timestamps or max(timestamps) < cutoff_time
-        ]
-        for user_id in users_to_remove:
-            del self._user_logs[user_id]
+        # Buckets are kept in activity order, so stale ones are at the front.
+        # An idle bucket is full again, so dropping it does not change behavior.
+        while self._buckets:
+            _, last_refill = next(iter(self._buckets.values()))
+            if last_refill >= cutoff_time:
+                break
+            self._buckets.popitem(last=False)
@@ -5,7 +5,7 @@
 import re
 from dataclasses import dataclass
 from enum import Enum
-from urllib.parse import parse_qs, urlencode, urlparse
+from urllib.parse import SplitResult, parse_qsl, urlencode, urlsplit
 
 
 class Platform(Enum):
@@ -27,23 +27,32 @@ class ValidationResult:
     sanitized_url: str | None = None
 
 
-# Platform patterns — each regex already encodes the allowed domains,
-# so a separate domain whitelist is unnecessary.
-_PLATFORM_PATTERNS: dict[Platform, list[str]] = {
-    Platform.YOUTUBE: [
-        r"^https?://(?:www\.|m\.)?youtube\.com/watch\?v=[\w-]+",
-        r"^https?://(?:www\.|m\.)?youtube\.com/shorts/[\w-]+",
-        r"^https?://(?:www\.)?youtu\.be/[\w-]+",
-        r"^https?://(?:www\.|m\.)?youtube\.com/embed/[\w-]+",
-    ],
-    Platform.INSTAGRAM: [
-        r"^https?://(?:www\.|m\.)?instagram\.com/(?:p|reel|reels|tv)/[\w-]+",
-    ],
-    Platform.TIKTOK: [
-        r"^https?://(?:www\.|m\.)?tiktok\.com/@[\w.-]+/video/\d+",
-        r"^https?://(?:vm|vt)\.tiktok\.com/[\w]+",
-        r"^https?://(?:www\.)?tiktok\.com/t/[\w]+",
-    ],
+_MAX_URL_LENGTH = 2048
+
+# Path patterns accepted on each host (matched against "path?query").
+_YOUTUBE_PATH_RE = re.compile(r"/(?:watch\?v=|shorts/|embed/)[\w-]+", re.IGNORECASE)
+_YOUTU_BE_PATH_RE = re.compile(r"/[\w-]+")
+_INSTAGRAM_PATH_RE = re.compile(r"/(?:p|reel|reels|tv)/[\w-]+", re.IGNORECASE)
+_TIKTOK_PATH_RE = re.compile(r"/(?:@[\w.-]+/video/\d+|t/\w+)", re.IGNORECASE)
+_TIKTOK_MOBILE_PATH_RE = re.compile(r"/@[\w.-]+/video/\d+", re.IGNORECASE)
+_TIKTOK_SHORT_PATH_RE = re.compile(r"/\w+")
+
+# Allowed hosts — lookup is by exact (lowercased) netloc, so this table is
+# also the domain whitelist: anything not listed here is rejected outright.
+_HOSTS: dict[str, tuple[Platform, re.Pattern[str]]] = {
+    "youtube.com": (Platform.YOUTUBE, _YOUTUBE_PATH_RE),
+    "www.youtube.com": (Platform.YOUTUBE, _YOUTUBE_PATH_RE),
+    "m.youtube.com": (Platform.YOUTUBE, _YOUTUBE_PATH_RE),
+    "youtu.be": (Platform.YOUTUBE, _YOUTU_BE_PATH_RE),
+    "www.youtu.be": (Platform.YOUTUBE, _YOUTU_BE_PATH_RE),
+    "instagram.com": (Platform.INSTAGRAM, _INSTAGRAM_PATH_RE),
+    "www.instagram.com": (Platform.INSTAGRAM, _INSTAGRAM_PATH_RE),
+    "m.instagram.com": (Platform.INSTAGRAM, _INSTAGRAM_PATH_RE),
+    "tiktok.com": (Platform.TIKTOK, _TIKTOK_PATH_RE),
+    "www.tiktok.com": (Platform.TIKTOK, _TIKTOK_PATH_RE),
+    "m.tiktok.com": (Platform.TIKTOK, _TIKTOK_MOBILE_PATH_RE),
+    "vm.tiktok.com": (Platform.TIKTOK, _TIKTOK_SHORT_PATH_RE),
+    "vt.tiktok.com": (Platform.TIKTOK, _TIKTOK_SHORT_PATH_RE),
 }
 
 # Query params to keep per platform (everything else is stripped)
@@ -70,25 +79,36 @@ def validate_url(url: str) -> ValidationResult:
 
     url = url.strip()
 
-    parsed = urlparse(url)
-    if not parsed.scheme or not parsed.netloc:
+    # Cheap checks before any parsing
+    if len(url) > _MAX_URL_LENGTH:
         return ValidationResult(
             is_valid=False,
             platform=Platform.UNKNOWN,
-            error_message="Invalid URL format",
+            error_message="URL is too long",
         )
 
-    if parsed.scheme not in ("http", "https"):
+    if not url[:8].lower().startswith(("http://", "https://")):
         return ValidationResult(
             is_valid=False,
             platform=Platform.UNKNOWN,
             error_message="Only HTTP/HTTPS URLs are allowed",
         )
 
-    # Match against platform patterns (domain check is embedded in regex)
-    for platform, patterns in _PLATFORM_PATTERNS.items():
-        if any(re.match(p, url, re.IGNORECASE) for p in patterns):
-            sanitized = _strip_tracking_params(url, platform)
+    parsed = urlsplit(url)
+    if not parsed.netloc:
+        return ValidationResult(
+            is_valid=False,
+            platform=Platform.UNKNOWN,
+            error_message="Invalid URL format",
+        )
+
+    # Host lookup first, then a single path check for that host
+    host = _HOSTS.get(parsed.netloc.lower())
+    if host is not None:
+        platform, path_re = host
+        target = f"{parsed.path}?{parsed.query}" if parsed.query else parsed.path
+        if path_re.match(target):
+            sanitized = _strip_tracking_params(parsed, platform)
             return ValidationResult(
                 is_valid=True,
                 platform=platform,
@@ -102,11 +122,17 @@ def validate_url(url: str) -> ValidationResult:
     )
 
 
-def _strip_tracking_params(url: str, platform: Platform) -> str:
+def _strip_tracking_params(parsed: SplitResult, platform: Platform) -> str:
     """Strip tracking/analytics query params, keeping only meaningful ones."""
-    parsed = urlparse(url)
+    # Nothing to strip (typical for short links). geturl() still normalizes the
+    # scheme to lowercase, which yt-dlp's extractor patterns expect.
+    if not parsed.query and not parsed.fragment:
+        return parsed.geturl()
+
     allowed = _ALLOWED_QUERY_PARAMS.get(platform, set())
-    query_params = parse_qs(parsed.query)
-    filtered = {k: v for k, v in query_params.items() if k in allowed}
-    clean_query = urlencode(filtered, doseq=True)
-    return parsed._replace(query=clean_query, fragment="").geturl()
+    if not allowed:
+        return parsed._replace(query="", fragment="").geturl()
+
+    # Decode and re-encode kept params so malformed input is normalized
+    kept = [(key, value) for key, value in parse_qsl(parsed.query) if key in allowed]
+    return parsed._replace(query=urlencode(kept), fragment="").geturl()
@@ -2,11 +2,12 @@
 
 """Pytest configuration and fixtures."""
 
-import tempfile
-from pathlib import Path
+from collections.abc import Awaitable, Callable
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from aiogram.types import Message
 
 from bot.config import get_settings
 from bot.services import RateLimiter, VideoDownloader
@@ -23,10 +24,9 @@ def clear_settings_cache():
 
 
 @pytest.fixture
-def temp_dir():
-    """Create a temporary directory for tests."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        yield Path(tmpdir)
+def temp_dir(tmp_path):
+    """Create a temporary directory for tests (unique per test and xdist worker)."""
+    return tmp_path
 
 
 @pytest.fixture
@@ -45,35 +45,55 @@ def rate_limiter():
     return RateLimiter(max_requests=5, window_seconds=60)
 
 
+class _FakeMessage:
+    """Minimal stand-in for aiogram's Message with just what the handlers use."""
+
+    __slots__ = ("answer", "answer_video", "from_user", "text")
+
+    def __init__(self, text: str | None, from_user: SimpleNamespace | None):
+        self.text = text
+        self.from_user = from_user
+        self.answer = AsyncMock()
+        self.answer_video = AsyncMock()
+
+
 def make_message(
     text: str | None = "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
     user_id: int = USER_ID,
     *,
     has_user: bool = True,
-) -> AsyncMock:
-    """Create a mock Telegram message for handler tests."""
-    message = AsyncMock()
-    message.text = text
-    message.answer = AsyncMock()
-    message.answer_video = AsyncMock()
+) -> _FakeMessage:
+    """
+    Create a fake Telegram message for handler tests.
+
+    Tests that reach the download path must give it a status message to edit,
+    e.g. ``message.answer = reply_with(make_processing_message())``.
+    """
+    return _FakeMessage(text, SimpleNamespace(id=user_id) if has_user else None)
+
+
+def make_processing_message() -> MagicMock:
+    """Create a mock of the "Downloading..." status message sent by the bot."""
+    processing_msg = MagicMock(spec=Message)
+    processing_msg.edit_text = AsyncMock()
+    processing_msg.delete = AsyncMock()
+    return processing_msg
+
+
+def reply_with(reply: MagicMock) -> Callable[..., Awaitable[MagicMock]]:
+    """Create a plain async stand-in for message.answer that returns ``reply``."""
 
-    if has_user:
-        message.from_user = MagicMock()
-        message.from_user.id = user_id
-    else:
-        message.from_user = None
+    async def answer(*args: object, **kwargs: object) -> MagicMock:
+        return reply
 
-    return message
+    return answer
 
 
-FAKE_UUID_HEX = "ab" * 16  # uuid4().hex is 32 chars; [:8] → "abababab"
-FAKE_ID = FAKE_UUID_HEX[:8]
+FAKE_ID = "abababab"  # os.urandom(4).hex() is 8 hex chars
 
 
 @pytest.fixture
-def mock_uuid():
-    """Mock uuid4 to produce a predictable file ID."""
-    mock = MagicMock()
-    mock.hex = FAKE_UUID_HEX
-    with patch("bot.services.downloader.uuid.uuid4", return_value=mock):
+def mock_download_id():
+    """Mock os.urandom to produce a predictable download ID."""
+    with patch("bot.services.downloader.os.urandom", return_value=bytes.fromhex(FAKE_ID)):
         yield
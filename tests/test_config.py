@@ -20,6 +20,7 @@ class TestSettings:
             "BOT_TOKEN": "test_token_123",
             "MAX_FILE_SIZE_MB": "30",
             "DOWNLOAD_TIMEOUT": "600",
+            "MAX_CONCURRENT_DOWNLOADS": "2",
             "TEMP_DIR": "/custom/temp",
             "RATE_LIMIT_REQUESTS": "10",
             "RATE_LIMIT_WINDOW": "120",
@@ -31,6 +32,7 @@ class TestSettings:
             assert settings.bot_token == "test_token_123"
             assert settings.max_file_size_mb == 30
             assert settings.download_timeout == 600
+            assert settings.max_concurrent_downloads == 2
             assert settings.temp_dir == "/custom/temp"
             assert settings.rate_limit_requests == 10
             assert settings.rate_limit_window == 120
@@ -44,6 +46,7 @@ class TestSettings:
 
             assert settings.max_file_size_mb == 50
             assert settings.download_timeout == 300
+            assert settings.max_concurrent_downloads == 4
             assert settings.temp_dir == "/tmp/yt-downloader-bot"  # noqa: S108
             assert settings.rate_limit_requests == 5
             assert settings.rate_limit_window == 60
@@ -68,7 +71,22 @@ class TestSettings:
         env_vars = {"BOT_TOKEN": "test_token", "MAX_FILE_SIZE_MB": "100"}
 
         with patch.dict(os.environ, env_vars, clear=True):
-            with pytest.raises(ValidationError, match="cannot exceed 50"):
+            with pytest.raises(ValidationError, match="less than or equal to 50"):
+                Settings()
+
+    def test_fractional_download_timeout(self):
+        """Test that download_timeout accepts fractions of a second."""
+        env_vars = {"BOT_TOKEN": "test_token", "DOWNLOAD_TIMEOUT": "0.5"}
+
+        with patch.dict(os.environ, env_vars, clear=True):
+            assert Settings().download_timeout == 0.5
+
+    def test_download_timeout_upper_bound(self):
+        """Test that download_timeout cannot exceed 600 seconds."""
+        env_vars = {"BOT_TOKEN": "test_token", "DOWNLOAD_TIMEOUT": "601"}
+
+        with patch.dict(os.environ, env_vars, clear=True):
+            with pytest.raises(ValidationError, match="less than or equal to 600"):
                 Settings()
 
     @pytest.mark.parametrize(
@@ -76,6 +94,7 @@ class TestSettings:
         [
             ("MAX_FILE_SIZE_MB", "0"),
             ("DOWNLOAD_TIMEOUT", "-1"),
+            ("MAX_CONCURRENT_DOWNLOADS", "0"),
             ("RATE_LIMIT_REQUESTS", "0"),
             ("RATE_LIMIT_WINDOW", "-5"),
         ],
@@ -84,7 +103,7 @@ class TestSettings:
         env_vars = {"BOT_TOKEN": "test_token", env_var: value}
 
         with patch.dict(os.environ, env_vars, clear=True):
-            with pytest.raises(ValidationError, match="must be positive"):
+            with pytest.raises(ValidationError, match="greater than 0"):
                 Settings()
 
 
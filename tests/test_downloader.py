@@ -2,6 +2,9 @@
 
 """Tests for video downloader service."""
 
+import asyncio
+import os
+import threading
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -17,16 +20,38 @@ from bot.services.downloader import (
 from .conftest import FAKE_ID
 
 
-def _mock_ydl_context(mock_ydl_class: MagicMock, side_effect=None, return_value=None):
-    """Wire up YoutubeDL mock so `with YoutubeDL(opts) as ydl` works."""
-    mock_instance = MagicMock()
-    mock_ydl_class.return_value.__enter__ = MagicMock(return_value=mock_instance)
-    mock_ydl_class.return_value.__exit__ = MagicMock(return_value=False)
-    if side_effect:
-        mock_instance.extract_info.side_effect = side_effect
-    else:
-        mock_instance.extract_info.return_value = return_value
-    return mock_instance
+@pytest.fixture(autouse=True)
+def fake_ydl(monkeypatch):
+    """Replace yt_dlp.YoutubeDL for every test in this module."""
+    fake = MagicMock()
+    monkeypatch.setattr("bot.services.downloader.yt_dlp.YoutubeDL", fake)
+    return fake
+
+
+@pytest.fixture
+def ydl_extract(fake_ydl):
+    """Return a setter configuring what `YoutubeDL(...).extract_info` does."""
+
+    def configure(return_value=None, side_effect=None) -> MagicMock:
+        mock_instance = fake_ydl.return_value.__enter__.return_value
+        if side_effect is not None:
+            mock_instance.extract_info.side_effect = side_effect
+        else:
+            mock_instance.extract_info.return_value = return_value
+        return mock_instance
+
+    return configure
+
+
+def _writes_video(video_file, size, info):
+    """extract_info side effect that "downloads" a file of ``size`` bytes."""
+
+    def extract(*args, **kwargs):
+        video_file.touch()
+        os.truncate(video_file, size)
+        return info
+
+    return extract
 
 
 class TestVideoDownloader:
@@ -46,6 +71,56 @@ class TestVideoDownloader:
         _downloader = VideoDownloader(temp_dir=str(new_dir))  # noqa: F841
         assert new_dir.exists()
 
+    def test_yt_dlp_options_are_copied_per_download(self, temp_dir):
+        downloader = VideoDownloader(temp_dir=str(temp_dir), cookies_file="cookies.txt")
+
+        first = downloader._get_yt_dlp_options("first.%(ext)s")
+        second = downloader._get_yt_dlp_options("second.%(ext)s")
+
+        assert first["outtmpl"] == "first.%(ext)s"
+        assert second["outtmpl"] == "second.%(ext)s"
+        assert first["cookiefile"] == "cookies.txt"
+        assert first["format"].startswith("best[ext=mp4][filesize<50M]")
+        assert first is not second
+
+    @pytest.mark.parametrize("value", [0, -1])
+    def test_invalid_max_concurrent(self, temp_dir, value):
+        with pytest.raises(ValueError, match="max_concurrent must be positive"):
+            VideoDownloader(temp_dir=str(temp_dir), max_concurrent=value)
+
+    @pytest.mark.parametrize(
+        "progress",
+        [
+            {"status": "downloading", "downloaded_bytes": 101},
+            {"status": "downloading", "downloaded_bytes": 10, "total_bytes": 101},
+        ],
+    )
+    def test_size_hook_aborts_oversized_download(self, temp_dir, progress):
+        downloader = VideoDownloader(temp_dir=str(temp_dir), max_file_size=100)
+
+        with pytest.raises(FileTooLargeError) as exc_info:
+            downloader._check_download_size(progress)
+
+        assert exc_info.value.file_size == 101
+
+    @pytest.mark.parametrize(
+        "progress",
+        [
+            {"status": "downloading", "downloaded_bytes": 50, "total_bytes": None},
+            {"status": "downloading"},
+            {"status": "finished", "total_bytes": 500},
+        ],
+    )
+    def test_size_hook_allows_download(self, temp_dir, progress):
+        downloader = VideoDownloader(temp_dir=str(temp_dir), max_file_size=100)
+        downloader._check_download_size(progress)
+
+    def test_file_too_large_error_sizes_in_mb(self):
+        error = FileTooLargeError(60 * 1024 * 1024 + 1, 50 * 1024 * 1024)
+        assert error.file_size_mb == 60
+        assert error.max_size_mb == 50
+        assert str(error) == "File size (60MB) exceeds limit (50MB)"
+
     def test_cleanup_file(self, downloader, temp_dir):
         test_file = temp_dir / "test_video.mp4"
         test_file.write_text("test content")
@@ -54,6 +129,16 @@ class TestVideoDownloader:
         downloader.cleanup_file(test_file)
         assert not test_file.exists()
 
+    def test_cleanup_file_removes_download_dir(self, downloader, temp_dir):
+        download_dir = temp_dir / "abcd1234"
+        download_dir.mkdir()
+        test_file = download_dir / "video.mp4"
+        test_file.write_text("test content")
+
+        downloader.cleanup_file(test_file)
+        assert not download_dir.exists()
+        assert temp_dir.exists()
+
     def test_cleanup_nonexistent_file(self, downloader, temp_dir):
         nonexistent = temp_dir / "nonexistent.mp4"
         downloader.cleanup_file(nonexistent)
@@ -63,17 +148,13 @@ class TestDownload:
     """Test cases for VideoDownloader.download()."""
 
     @pytest.mark.asyncio
-    async def test_successful_download(self, downloader, temp_dir, mock_uuid):
-        video_file = temp_dir / f"video_{FAKE_ID}.mp4"
-        video_file.write_bytes(b"x" * 1024)
-
-        with patch("yt_dlp.YoutubeDL") as mock_ydl:
-            _mock_ydl_context(
-                mock_ydl,
-                return_value={"title": "Test Video", "duration": 120},
-            )
+    async def test_successful_download(self, downloader, temp_dir, mock_download_id, ydl_extract):
+        video_file = temp_dir / FAKE_ID / "video.mp4"
+        ydl_extract(
+            side_effect=_writes_video(video_file, 1024, {"title": "Test Video", "duration": 120})
+        )
 
-            result = await downloader.download("https://youtube.com/watch?v=test")
+        result = await downloader.download("https://youtube.com/watch?v=test")
 
         assert result.title == "Test Video"
         assert result.duration == 120
@@ -81,97 +162,251 @@ class TestDownload:
         assert result.file_path == video_file
 
     @pytest.mark.asyncio
-    async def test_download_fallback_title(self, downloader, temp_dir, mock_uuid):
-        video_file = temp_dir / f"video_{FAKE_ID}.mp4"
-        video_file.write_bytes(b"x" * 512)
-
-        with patch("yt_dlp.YoutubeDL") as mock_ydl:
-            _mock_ydl_context(mock_ydl, return_value={})
+    async def test_download_fallback_title(
+        self, downloader, temp_dir, mock_download_id, ydl_extract
+    ):
+        video_file = temp_dir / FAKE_ID / "video.mp4"
+        ydl_extract(side_effect=_writes_video(video_file, 512, {}))
 
-            result = await downloader.download("https://youtube.com/watch?v=test")
+        result = await downloader.download("https://youtube.com/watch?v=test")
 
         assert result.title == "Unknown"
         assert result.duration is None
 
     @pytest.mark.asyncio
-    async def test_download_none_info(self, downloader):
-        with patch("yt_dlp.YoutubeDL") as mock_ydl:
-            _mock_ydl_context(mock_ydl, return_value=None)
+    async def test_download_none_info(self, downloader, ydl_extract):
+        ydl_extract(return_value=None)
 
-            with pytest.raises(VideoUnavailableError, match="Could not download"):
-                await downloader.download("https://youtube.com/watch?v=test")
+        with pytest.raises(VideoUnavailableError, match="Could not download"):
+            await downloader.download("https://youtube.com/watch?v=test")
 
     @pytest.mark.asyncio
-    async def test_download_file_too_large(self, temp_dir, mock_uuid):
+    async def test_download_file_too_large(self, temp_dir, mock_download_id, ydl_extract):
         downloader = VideoDownloader(
             temp_dir=str(temp_dir),
             max_file_size=100,
             timeout=60,
         )
 
-        video_file = temp_dir / f"video_{FAKE_ID}.mp4"
-        video_file.write_bytes(b"x" * 200)
-
-        with patch("yt_dlp.YoutubeDL") as mock_ydl:
-            _mock_ydl_context(mock_ydl, return_value={"title": "Big Video"})
+        video_file = temp_dir / FAKE_ID / "video.mp4"
+        ydl_extract(side_effect=_writes_video(video_file, 200, {"title": "Big Video"}))
 
-            with pytest.raises(FileTooLargeError) as exc_info:
-                await downloader.download("https://youtube.com/watch?v=test")
+        with pytest.raises(FileTooLargeError) as exc_info:
+            await downloader.download("https://youtube.com/watch?v=test")
 
         assert exc_info.value.file_size == 200
         assert exc_info.value.max_size == 100
-        assert not video_file.exists()
+        assert not video_file.parent.exists()
+
+    @pytest.mark.asyncio
+    async def test_download_aborted_by_size_hook_cleans_up(
+        self, downloader, temp_dir, mock_download_id, ydl_extract
+    ):
+        partial_file = temp_dir / FAKE_ID / "video.mp4.part"
+
+        def oversized_extract(*args, **kwargs):
+            partial_file.write_bytes(b"x" * 64)
+            raise FileTooLargeError(60 * 1024 * 1024, downloader.max_file_size)
+
+        ydl_extract(side_effect=oversized_extract)
+
+        with pytest.raises(FileTooLargeError):
+            await downloader.download("https://youtube.com/watch?v=test")
+
+        assert not partial_file.parent.exists()
+
+    @pytest.mark.asyncio
+    async def test_download_finds_file_with_changed_extension(
+        self, downloader, temp_dir, mock_download_id, ydl_extract
+    ):
+        video_file = temp_dir / FAKE_ID / "video.mkv"
+
+        def remuxing_extract(*args, **kwargs):
+            (temp_dir / FAKE_ID / "video.webm.part").write_bytes(b"x")
+            return _writes_video(video_file, 16, {"title": "Remuxed", "ext": "webm"})()
+
+        ydl_extract(side_effect=remuxing_extract)
+
+        result = await downloader.download("https://youtube.com/watch?v=test")
+
+        assert result.file_path == video_file
+
+    @pytest.mark.asyncio
+    async def test_download_recreates_removed_temp_dir(
+        self, temp_dir, mock_download_id, ydl_extract
+    ):
+        root = temp_dir / "downloads"
+        downloader = VideoDownloader(temp_dir=str(root))
+        root.rmdir()  # e.g. wiped by a tmp cleaner while the bot runs
+        video_file = root / FAKE_ID / "video.mp4"
+        ydl_extract(side_effect=_writes_video(video_file, 16, {"title": "Test Video"}))
+
+        result = await downloader.download("https://youtube.com/watch?v=test")
+
+        assert result.file_path == video_file
+
+    @pytest.mark.asyncio
+    async def test_download_dir_collision_picks_new_id(self, downloader, temp_dir, ydl_extract):
+        taken = temp_dir / FAKE_ID
+        taken.mkdir()
+        (taken / "video.mp4").write_bytes(b"other download")
+        video_file = temp_dir / "cdcdcdcd" / "video.mp4"
+        ydl_extract(side_effect=_writes_video(video_file, 16, {"title": "Test Video"}))
+
+        ids = [bytes.fromhex(FAKE_ID), bytes.fromhex("cdcdcdcd")]
+        with patch("bot.services.downloader.os.urandom", side_effect=ids):
+            result = await downloader.download("https://youtube.com/watch?v=test")
+
+        assert result.file_path == video_file
+        assert (taken / "video.mp4").read_bytes() == b"other download"
+
+    @pytest.mark.asyncio
+    async def test_download_dir_collisions_exhausted(
+        self, downloader, temp_dir, mock_download_id, ydl_extract
+    ):
+        (temp_dir / FAKE_ID).mkdir()
+
+        with pytest.raises(DownloadError, match="unique download directory"):
+            await downloader.download("https://youtube.com/watch?v=test")
+
+        assert (temp_dir / FAKE_ID).exists()
+
+    @pytest.mark.asyncio
+    async def test_failed_download_removes_download_dir(
+        self, downloader, temp_dir, mock_download_id, ydl_extract
+    ):
+        def failing_extract(*args, **kwargs):
+            (temp_dir / FAKE_ID / "video.mp4.part").write_bytes(b"x")
+            raise yt_dlp.utils.DownloadError("Network error")
+
+        ydl_extract(side_effect=failing_extract)
+
+        with pytest.raises(DownloadError):
+            await downloader.download("https://youtube.com/watch?v=test")
+
+        assert not (temp_dir / FAKE_ID).exists()
 
     @pytest.mark.asyncio
     @pytest.mark.parametrize("error_msg", ["Video is private", "This video is unavailable"])
-    async def test_download_private_or_unavailable(self, downloader, error_msg):
-        with patch("yt_dlp.YoutubeDL") as mock_ydl:
-            _mock_ydl_context(
-                mock_ydl,
-                side_effect=yt_dlp.utils.DownloadError(error_msg),
-            )
+    async def test_download_private_or_unavailable(self, downloader, error_msg, ydl_extract):
+        ydl_extract(side_effect=yt_dlp.utils.DownloadError(error_msg))
 
-            with pytest.raises(VideoUnavailableError, match="private or unavailable"):
-                await downloader.download("https://youtube.com/watch?v=test")
+        with pytest.raises(VideoUnavailableError, match="private or unavailable"):
+            await downloader.download("https://youtube.com/watch?v=test")
 
     @pytest.mark.asyncio
-    async def test_download_generic_ytdlp_error(self, downloader):
-        with patch("yt_dlp.YoutubeDL") as mock_ydl:
-            _mock_ydl_context(
-                mock_ydl,
-                side_effect=yt_dlp.utils.DownloadError("Network error"),
-            )
+    async def test_download_generic_ytdlp_error(self, downloader, ydl_extract):
+        ydl_extract(side_effect=yt_dlp.utils.DownloadError("Network error"))
 
-            with pytest.raises(DownloadError, match="Download failed"):
-                await downloader.download("https://youtube.com/watch?v=test")
+        with pytest.raises(DownloadError, match="Download failed"):
+            await downloader.download("https://youtube.com/watch?v=test")
 
     @pytest.mark.asyncio
-    async def test_download_timeout(self, temp_dir):
-        import time
+    async def test_download_timeout(self, temp_dir, mock_download_id, ydl_extract):
+        downloader = VideoDownloader(temp_dir=str(temp_dir), timeout=0.01, max_concurrent=1)
+        release = threading.Event()
+        ydl_extract(side_effect=lambda *args, **kwargs: release.wait(timeout=1))
 
-        downloader = VideoDownloader(
-            temp_dir=str(temp_dir),
-            max_file_size=50 * 1024 * 1024,
-            timeout=1,
-        )
+        with pytest.raises(DownloadError, match="timed out after 0.01 seconds"):
+            await downloader.download("https://youtube.com/watch?v=test")
+
+        # Let the abandoned worker thread finish and give its slot back
+        release.set()
+        async with downloader._semaphore:
+            pass
+        assert not (temp_dir / FAKE_ID).exists()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_downloads_are_bounded(self, temp_dir, ydl_extract):
+        downloader = VideoDownloader(temp_dir=str(temp_dir), max_concurrent=2)
+        lock = threading.Lock()
+        both_running = threading.Event()
+        release = threading.Event()
+        active = 0
+        peak = 0
+        calls = 0
+
+        def tracked_extract(*args, **kwargs):
+            nonlocal active, peak, calls
+            with lock:
+                calls += 1
+                active += 1
+                peak = max(peak, active)
+                if active == 2:
+                    both_running.set()
+            release.wait(timeout=1)
+            with lock:
+                active -= 1
+            return None
+
+        ydl_extract(side_effect=tracked_extract)
+
+        tasks = [
+            asyncio.create_task(downloader.download("https://youtube.com/watch?v=test"))
+            for _ in range(3)
+        ]
+        assert await asyncio.to_thread(both_running.wait, 1)
+
+        # Both slots are taken, so the third download is parked on the semaphore
+        assert downloader._semaphore.locked()
+        assert calls == 2
+        assert not tasks[2].done()
+
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert all(isinstance(r, VideoUnavailableError) for r in results)
+        assert calls == 3
+        assert peak == 2
 
-        def slow_extract(*args, **kwargs):
-            time.sleep(3)
-            return {"title": "Test"}
+    @pytest.mark.asyncio
+    async def test_timed_out_download_keeps_its_slot(self, temp_dir, ydl_extract):
+        downloader = VideoDownloader(temp_dir=str(temp_dir), timeout=0.01, max_concurrent=1)
+        first_running = threading.Event()
+        release = threading.Event()
+        calls = 0
+
+        def extract(*args, **kwargs):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                first_running.set()
+                release.wait(timeout=1)
+            return None
+
+        ydl_extract(side_effect=extract)
+
+        with pytest.raises(DownloadError, match="timed out"):
+            await downloader.download("https://youtube.com/watch?v=test")
+
+        # The first yt-dlp thread is still running and keeps its slot
+        assert await asyncio.to_thread(first_running.wait, 1)
+        assert downloader._semaphore.locked()
+
+        downloader._timeout = 60
+        second = asyncio.create_task(downloader.download("https://youtube.com/watch?v=test"))
+        await asyncio.sleep(0)  # let it reach the semaphore
+        assert not second.done()
+        assert calls == 1
+
+        release.set()
+        with pytest.raises(VideoUnavailableError):
+            await second
+        assert calls == 2
+
+    @pytest.mark.asyncio
+    async def test_download_propagates_typed_errors(self, downloader, ydl_extract):
+        error = FileTooLargeError(60 * 1024 * 1024, 50 * 1024 * 1024)
+        ydl_extract(side_effect=error)
 
-        with patch("yt_dlp.YoutubeDL") as mock_ydl:
-            _mock_ydl_context(mock_ydl, side_effect=slow_extract)
+        with pytest.raises(FileTooLargeError) as exc_info:
+            await downloader.download("https://youtube.com/watch?v=test")
 
-            with pytest.raises(DownloadError, match="timed out"):
-                await downloader.download("https://youtube.com/watch?v=test")
+        assert exc_info.value is error
 
     @pytest.mark.asyncio
-    async def test_download_unexpected_error(self, downloader):
-        with patch("yt_dlp.YoutubeDL") as mock_ydl:
-            _mock_ydl_context(
-                mock_ydl,
-                side_effect=RuntimeError("something broke"),
-            )
+    async def test_download_unexpected_error(self, downloader, ydl_extract):
+        ydl_extract(side_effect=RuntimeError("something broke"))
 
-            with pytest.raises(DownloadError, match="Unexpected error"):
-                await downloader.download("https://youtube.com/watch?v=test")
+        with pytest.raises(DownloadError, match="Unexpected error"):
+            await downloader.download("https://youtube.com/watch?v=test")
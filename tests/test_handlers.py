@@ -2,11 +2,13 @@
 
 """Tests for message handlers."""
 
-from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+from unittest.mock import MagicMock, patch
 
 import pytest
 
 from bot.handlers.video import (
+    _active_downloads,
     _format_duration,
     _sanitize_filename,
     handle_help,
@@ -20,7 +22,7 @@ from bot.services.downloader import (
     VideoUnavailableError,
 )
 
-from .conftest import USER_ID, make_message
+from .conftest import USER_ID, make_message, make_processing_message, reply_with
 
 
 class TestFormatDuration:
@@ -37,6 +39,7 @@ class TestFormatDuration:
             (7200, "2:00:00"),
             (None, "Unknown"),
         ],
+        ids=["zero", "45s", "2m05s", "10m", "1h01m01s", "2h", "none"],
     )
     def test_format_duration(self, seconds, expected):
         assert _format_duration(seconds) == expected
@@ -48,6 +51,9 @@ class TestSanitizeFilename:
     def test_removes_unsafe_characters(self):
         assert _sanitize_filename('test<>:"/\\|?*file') == "testfile"
 
+    def test_removes_control_characters(self):
+        assert _sanitize_filename("a\x00b\x07c\x1fd") == "abcd"
+
     def test_truncates_long_names(self):
         long_name = "a" * 100
         result = _sanitize_filename(long_name, max_length=50)
@@ -63,14 +69,27 @@ class TestSanitizeFilename:
     def test_normalizes_whitespace(self):
         assert _sanitize_filename("hello   world") == "hello world"
 
+    @pytest.mark.parametrize(
+        ("title", "expected"),
+        [
+            ("hello\tworld", "helloworld"),  # control chars are removed, not spaced
+            ("  leading and trailing  ", "leading and trailing"),
+            ("snake_case__title", "snake case title"),
+            ("mixed _ \t\n_runs", "mixed runs"),
+            ("__", "video"),
+            ("non\u00a0breaking\u2003space", "non breaking space"),
+        ],
+    )
+    def test_collapses_whitespace_and_underscores(self, title, expected):
+        assert _sanitize_filename(title) == expected
+
 
 class TestStartHandler:
     """Test cases for /start command handler."""
 
     @pytest.mark.asyncio
     async def test_start_command(self):
-        message = AsyncMock()
-        message.answer = AsyncMock()
+        message = make_message()
 
         await handle_start(message)
 
@@ -87,8 +106,7 @@ class TestHelpHandler:
 
     @pytest.mark.asyncio
     async def test_help_command(self):
-        message = AsyncMock()
-        message.answer = AsyncMock()
+        message = make_message()
 
         await handle_help(message)
 
@@ -135,12 +153,11 @@ class TestVideoUrlHandler:
     @pytest.mark.asyncio
     async def test_successful_download(self, downloader, rate_limiter, temp_dir):
         fake_video = temp_dir / "video_test1234.mp4"
-        fake_video.write_bytes(b"fake video content")
+        fake_video.touch()
 
         message = make_message()
-        processing_msg = AsyncMock()
-        processing_msg.delete = AsyncMock()
-        message.answer.return_value = processing_msg
+        processing_msg = make_processing_message()
+        message.answer = reply_with(processing_msg)
 
         mock_result = DownloadResult(
             file_path=fake_video,
@@ -157,67 +174,65 @@ class TestVideoUrlHandler:
         processing_msg.delete.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_file_too_large(self, downloader, rate_limiter):
+    @pytest.mark.parametrize(
+        ("error", "expected"),
+        [
+            (
+                FileTooLargeError(60 * 1024 * 1024, 50 * 1024 * 1024),
+                "too large (60MB). Maximum allowed size is 50MB",
+            ),
+            (VideoUnavailableError("Video is private"), "Video unavailable: Video is private"),
+            (DownloadError("Network error"), "Failed to download"),
+            (RuntimeError("something broke"), "unexpected error"),
+        ],
+        ids=["too-large", "unavailable", "download-error", "unexpected"],
+    )
+    async def test_download_failure_reported(self, downloader, rate_limiter, error, expected):
         message = make_message()
-        processing_msg = AsyncMock()
-        processing_msg.edit_text = AsyncMock()
-        message.answer.return_value = processing_msg
-
-        with patch.object(
-            downloader,
-            "download",
-            side_effect=FileTooLargeError(60 * 1024 * 1024, 50 * 1024 * 1024),
-        ):
-            await handle_video_url(message, downloader, rate_limiter)
+        processing_msg = make_processing_message()
+        message.answer = reply_with(processing_msg)
 
-        processing_msg.edit_text.assert_called_once()
-        assert "too large" in processing_msg.edit_text.call_args[0][0]
-
-    @pytest.mark.asyncio
-    async def test_video_unavailable(self, downloader, rate_limiter):
-        message = make_message()
-        processing_msg = AsyncMock()
-        processing_msg.edit_text = AsyncMock()
-        message.answer.return_value = processing_msg
-
-        with patch.object(
-            downloader,
-            "download",
-            side_effect=VideoUnavailableError("Video is private"),
-        ):
+        with patch.object(downloader, "download", side_effect=error):
             await handle_video_url(message, downloader, rate_limiter)
 
         processing_msg.edit_text.assert_called_once()
-        assert "unavailable" in processing_msg.edit_text.call_args[0][0].lower()
+        assert expected in processing_msg.edit_text.call_args[0][0]
 
     @pytest.mark.asyncio
-    async def test_download_error(self, downloader, rate_limiter):
-        message = make_message()
-        processing_msg = AsyncMock()
-        processing_msg.edit_text = AsyncMock()
-        message.answer.return_value = processing_msg
-
-        with patch.object(
-            downloader,
-            "download",
-            side_effect=DownloadError("Network error"),
-        ):
-            await handle_video_url(message, downloader, rate_limiter)
+    async def test_duplicate_url_while_downloading(self, downloader, rate_limiter):
+        first = make_message()
+        first.answer = reply_with(make_processing_message())
+        duplicate = make_message()
+        release = asyncio.Event()
 
-        processing_msg.edit_text.assert_called_once()
-        assert "Failed to download" in processing_msg.edit_text.call_args[0][0]
+        async def blocked_download(url):
+            await release.wait()
+            raise DownloadError("Network error")
 
-    @pytest.mark.asyncio
-    async def test_empty_message(self, downloader, rate_limiter):
-        message = make_message(text=None)
+        with patch.object(downloader, "download", side_effect=blocked_download) as download:
+            task = asyncio.create_task(handle_video_url(first, downloader, rate_limiter))
+            await asyncio.sleep(0)
 
-        await handle_video_url(message, downloader, rate_limiter)
+            await handle_video_url(duplicate, downloader, rate_limiter)
 
-        message.answer.assert_not_called()
+            release.set()
+            await task
+
+        download.assert_called_once()
+        duplicate.answer.assert_called_once()
+        assert "already being downloaded" in duplicate.answer.call_args[0][0]
+        assert _active_downloads == set()
 
     @pytest.mark.asyncio
-    async def test_no_user(self, downloader, rate_limiter):
-        message = make_message(text="https://youtube.com/watch?v=test", has_user=False)
+    @pytest.mark.parametrize(
+        ("text", "has_user"),
+        [(None, True), ("https://youtube.com/watch?v=test", False)],
+        ids=["no-text", "no-user"],
+    )
+    async def test_ignores_message_without_text_or_user(
+        self, downloader, rate_limiter, text, has_user
+    ):
+        message = make_message(text=text, has_user=has_user)
 
         await handle_video_url(message, downloader, rate_limiter)
 
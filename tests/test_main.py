@@ -2,11 +2,12 @@
 
 """Tests for main module."""
 
-import os
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
+from pydantic import ValidationError
 
+from bot.config import Settings
 from bot.main import main
 
 
@@ -15,16 +16,29 @@ class TestMain:
 
     @pytest.mark.asyncio
     async def test_main_missing_bot_token(self):
-        from bot.config import get_settings
+        error = ValidationError.from_exception_data(
+            "Settings", [{"type": "missing", "loc": ("bot_token",), "input": {}}]
+        )
 
-        get_settings.cache_clear()
-        with (
-            patch.dict(os.environ, {}, clear=True),
-            patch(
-                "bot.config.Settings.model_config",
-                {"env_file": None, "env_file_encoding": "utf-8", "case_sensitive": False},
-            ),
-        ):
+        with patch("bot.main.get_settings", side_effect=error):
             with pytest.raises(SystemExit) as exc_info:
                 await main()
             assert exc_info.value.code == 1
+
+    @pytest.mark.asyncio
+    async def test_main_uses_injected_settings(self, tmp_path):
+        settings = Settings(_env_file=None, bot_token="123456:test", temp_dir=str(tmp_path))
+
+        with (
+            patch("bot.main.get_settings") as get_settings,
+            patch("bot.main.Bot") as bot_cls,
+            patch("bot.main.Dispatcher.start_polling", new_callable=AsyncMock) as start_polling,
+        ):
+            bot_cls.return_value.session.close = AsyncMock()
+            await main(settings=settings)
+
+        get_settings.assert_not_called()
+        bot_cls.assert_called_once()
+        assert bot_cls.call_args.kwargs["token"] == "123456:test"
+        start_polling.assert_awaited_once_with(bot_cls.return_value)
+        bot_cls.return_value.session.close.assert_awaited_once()
@@ -2,8 +2,6 @@
 
 """Tests for rate limiter service."""
 
-from unittest.mock import patch
-
 import pytest
 
 from bot.services.rate_limiter import RateLimiter, RateLimitExceeded
@@ -38,24 +36,54 @@ class TestRateLimiter:
         rate_limiter.check_rate_limit(user_2)
 
     def test_window_expiration(self):
-        rate_limiter = RateLimiter(max_requests=2, window_seconds=10)
+        current = [1000.0]
+        rate_limiter = RateLimiter(max_requests=2, window_seconds=10, clock=lambda: current[0])
         user_id = 12345
 
-        with patch("bot.services.rate_limiter.time.time") as mock_time:
-            mock_time.return_value = 1000.0
+        rate_limiter.check_rate_limit(user_id)
+        rate_limiter.check_rate_limit(user_id)
 
+        with pytest.raises(RateLimitExceeded):
             rate_limiter.check_rate_limit(user_id)
-            rate_limiter.check_rate_limit(user_id)
 
-            with pytest.raises(RateLimitExceeded):
-                rate_limiter.check_rate_limit(user_id)
+        # Advance past window
+        current[0] = 1011.0
+
+        # Should be allowed again
+        rate_limiter.check_rate_limit(user_id)
+
+    def test_tokens_refill_gradually(self):
+        current = [1000.0]
+        rate_limiter = RateLimiter(max_requests=2, window_seconds=10, clock=lambda: current[0])
+        user_id = 12345
+
+        rate_limiter.check_rate_limit(user_id)
+        rate_limiter.check_rate_limit(user_id)
 
-            # Advance past window
-            mock_time.return_value = 1011.0
+        # Half a window refills one of the two tokens
+        current[0] = 1005.0
+        rate_limiter.check_rate_limit(user_id)
 
-            # Should be allowed again
+        with pytest.raises(RateLimitExceeded) as exc_info:
             rate_limiter.check_rate_limit(user_id)
 
+        assert exc_info.value.retry_after == 5
+
+    def test_cleanup_removes_idle_users(self):
+        current = [1000.0]
+        rate_limiter = RateLimiter(max_requests=2, window_seconds=10, clock=lambda: current[0])
+        rate_limiter.check_rate_limit(11111)
+        rate_limiter.check_rate_limit(22222)
+
+        current[0] = 1050.0
+        rate_limiter.check_rate_limit(11111)  # user 11111 is active again
+
+        # Past the cleanup interval (10 windows) for user 22222 only
+        current[0] = 1101.0
+        rate_limiter.check_rate_limit(33333)
+
+        assert list(rate_limiter._buckets) == [11111, 33333]
+
     def test_retry_after_calculation(self):
         rate_limiter = RateLimiter(max_requests=1, window_seconds=10)
         user_id = 12345
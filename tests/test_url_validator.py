@@ -6,126 +6,107 @@ import pytest
 
 from bot.validators.url import Platform, validate_url
 
+_UNSUPPORTED = "Unsupported platform"
+_NOT_HTTP = "Only HTTP/HTTPS URLs are allowed"
+
+VALID_URLS: list[tuple[str, Platform]] = [
+    # YouTube
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", Platform.YOUTUBE),
+    ("https://youtube.com/watch?v=dQw4w9WgXcQ", Platform.YOUTUBE),
+    ("https://youtu.be/dQw4w9WgXcQ", Platform.YOUTUBE),
+    ("https://www.youtube.com/shorts/abc123xyz", Platform.YOUTUBE),
+    ("https://m.youtube.com/watch?v=dQw4w9WgXcQ", Platform.YOUTUBE),
+    ("http://www.youtube.com/watch?v=dQw4w9WgXcQ", Platform.YOUTUBE),
+    ("https://www.youtube.com/embed/dQw4w9WgXcQ", Platform.YOUTUBE),
+    # Instagram
+    ("https://www.instagram.com/reel/ABC123xyz/", Platform.INSTAGRAM),
+    ("https://instagram.com/reel/ABC123xyz/", Platform.INSTAGRAM),
+    ("https://www.instagram.com/p/ABC123xyz/", Platform.INSTAGRAM),
+    ("https://www.instagram.com/reels/ABC123xyz/", Platform.INSTAGRAM),
+    ("https://www.instagram.com/tv/ABC123xyz/", Platform.INSTAGRAM),
+    ("https://m.instagram.com/reel/ABC123xyz/", Platform.INSTAGRAM),
+    # TikTok
+    ("https://www.tiktok.com/@username/video/1234567890123456789", Platform.TIKTOK),
+    ("https://tiktok.com/@user.name/video/1234567890123456789", Platform.TIKTOK),
+    ("https://vm.tiktok.com/ZMxxxxxx/", Platform.TIKTOK),
+    ("https://vt.tiktok.com/ZSxxxxxx/", Platform.TIKTOK),
+    ("https://m.tiktok.com/@username/video/1234567890123456789", Platform.TIKTOK),
+    ("https://www.tiktok.com/t/ZTxxxxxx/", Platform.TIKTOK),
+]
+
+INVALID_URLS: list[tuple[str | None, str]] = [
+    # Empty/null
+    ("", "URL is empty or invalid"),
+    ("   ", _NOT_HTTP),
+    (None, "URL is empty or invalid"),
+    # Wrong format
+    ("not a url", _NOT_HTTP),
+    ("ftp://youtube.com/watch?v=abc", _NOT_HTTP),
+    ("javascript:alert(1)", _NOT_HTTP),
+    ("file:///etc/passwd", _NOT_HTTP),
+    ("data:text/html,<script>alert(1)</script>", _NOT_HTTP),
+    ("https:///watch?v=dQw4w9WgXcQ", "Invalid URL format"),
+    ("https://www.youtube.com/watch?v=" + "a" * 2048, "URL is too long"),
+    # Unsupported platforms
+    ("https://www.facebook.com/video/123", _UNSUPPORTED),
+    ("https://twitter.com/user/status/123", _UNSUPPORTED),
+    ("https://www.vimeo.com/123456", _UNSUPPORTED),
+    ("https://dailymotion.com/video/abc", _UNSUPPORTED),
+    ("https://example.com/video.mp4", _UNSUPPORTED),
+    # Wrong YouTube patterns
+    ("https://www.youtube.com/channel/UCabc", _UNSUPPORTED),
+    ("https://www.youtube.com/playlist?list=abc", _UNSUPPORTED),
+    ("https://www.youtube.com/", _UNSUPPORTED),
+    ("https://www.youtube.com/results?search_query=test", _UNSUPPORTED),
+    # Hosts that only look like supported ones
+    ("https://youtube.com.evil.com/watch?v=dQw4w9WgXcQ", _UNSUPPORTED),
+    ("https://evil.com@youtube.com/watch?v=dQw4w9WgXcQ", _UNSUPPORTED),
+    ("https://youtube.com:8080/watch?v=dQw4w9WgXcQ", _UNSUPPORTED),
+    ("https://m.youtu.be/dQw4w9WgXcQ", _UNSUPPORTED),
+    ("https://www.vm.tiktok.com/ZMxxxxxx/", _UNSUPPORTED),
+    ("https://www.youtube.com/watch;x?v=dQw4w9WgXcQ", _UNSUPPORTED),
+]
+
 
 class TestValidateUrl:
     """Test cases for validate_url."""
 
-    # Valid YouTube URLs
-    @pytest.mark.parametrize(
-        "url",
-        [
-            "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
-            "https://youtube.com/watch?v=dQw4w9WgXcQ",
-            "https://youtu.be/dQw4w9WgXcQ",
-            "https://www.youtube.com/shorts/abc123xyz",
-            "https://m.youtube.com/watch?v=dQw4w9WgXcQ",
-            "http://www.youtube.com/watch?v=dQw4w9WgXcQ",
-            "https://www.youtube.com/embed/dQw4w9WgXcQ",
-        ],
-    )
-    def test_valid_youtube_urls(self, url: str):
+    @pytest.mark.parametrize(("url", "platform"), VALID_URLS)
+    def test_valid_urls(self, url: str, platform: Platform):
         result = validate_url(url)
         assert result.is_valid is True
-        assert result.platform == Platform.YOUTUBE
+        assert result.platform == platform
         assert result.error_message is None
         assert result.sanitized_url is not None
 
-    # Valid Instagram URLs
-    @pytest.mark.parametrize(
-        "url",
-        [
-            "https://www.instagram.com/reel/ABC123xyz/",
-            "https://instagram.com/reel/ABC123xyz/",
-            "https://www.instagram.com/p/ABC123xyz/",
-            "https://www.instagram.com/reels/ABC123xyz/",
-            "https://www.instagram.com/tv/ABC123xyz/",
-            "https://m.instagram.com/reel/ABC123xyz/",
-        ],
-    )
-    def test_valid_instagram_urls(self, url: str):
-        result = validate_url(url)
-        assert result.is_valid is True
-        assert result.platform == Platform.INSTAGRAM
-        assert result.error_message is None
-
-    # Valid TikTok URLs
-    @pytest.mark.parametrize(
-        "url",
-        [
-            "https://www.tiktok.com/@username/video/1234567890123456789",
-            "https://tiktok.com/@user.name/video/1234567890123456789",
-            "https://vm.tiktok.com/ZMxxxxxx/",
-            "https://vt.tiktok.com/ZSxxxxxx/",
-            "https://m.tiktok.com/@username/video/1234567890123456789",
-            "https://www.tiktok.com/t/ZTxxxxxx/",
-        ],
-    )
-    def test_valid_tiktok_urls(self, url: str):
-        result = validate_url(url)
-        assert result.is_valid is True
-        assert result.platform == Platform.TIKTOK
-        assert result.error_message is None
-
-    # Invalid URLs - empty/null
-    @pytest.mark.parametrize(
-        "url",
-        [
-            "",
-            "   ",
-            None,
-        ],
-    )
-    def test_empty_urls(self, url):
+    @pytest.mark.parametrize(("url", "error"), INVALID_URLS)
+    def test_invalid_urls(self, url, error: str):
         result = validate_url(url)
         assert result.is_valid is False
         assert result.platform == Platform.UNKNOWN
         assert result.error_message is not None
+        assert error in result.error_message
 
-    # Invalid URLs - wrong format
-    @pytest.mark.parametrize(
-        "url",
-        [
-            "not a url",
-            "ftp://youtube.com/watch?v=abc",
-            "javascript:alert(1)",
-            "file:///etc/passwd",
-            "data:text/html,<script>alert(1)</script>",
-        ],
-    )
-    def test_invalid_url_formats(self, url: str):
-        result = validate_url(url)
-        assert result.is_valid is False
+    def test_accepts_uppercase_scheme(self):
+        result = validate_url("HTTPS://www.youtube.com/watch?v=dQw4w9WgXcQ")
+        assert result.is_valid is True
+        assert result.platform == Platform.YOUTUBE
+        assert result.sanitized_url == "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
 
-    # Invalid URLs - unsupported platforms
     @pytest.mark.parametrize(
         "url",
         [
-            "https://www.facebook.com/video/123",
-            "https://twitter.com/user/status/123",
-            "https://www.vimeo.com/123456",
-            "https://dailymotion.com/video/abc",
-            "https://example.com/video.mp4",
+            "https://youtu.be/dQw4w9WgXcQ",
+            "https://vm.tiktok.com/ZMxxxxxx/",
+            "https://www.instagram.com/reel/ABC123xyz/",
         ],
     )
-    def test_unsupported_platforms(self, url: str):
-        result = validate_url(url)
-        assert result.is_valid is False
-        assert result.platform == Platform.UNKNOWN
-        assert "Unsupported platform" in result.error_message
+    def test_url_without_query_is_unchanged(self, url: str):
+        assert validate_url(url).sanitized_url == url
 
-    # Invalid YouTube URLs (wrong patterns)
-    @pytest.mark.parametrize(
-        "url",
-        [
-            "https://www.youtube.com/channel/UCabc",
-            "https://www.youtube.com/playlist?list=abc",
-            "https://www.youtube.com/",
-            "https://www.youtube.com/results?search_query=test",
-        ],
-    )
-    def test_invalid_youtube_patterns(self, url: str):
-        result = validate_url(url)
-        assert result.is_valid is False
+    def test_short_link_keeps_uppercase_path(self):
+        result = validate_url("HTTPS://youtu.be/AbCdEf")
+        assert result.sanitized_url == "https://youtu.be/AbCdEf"
 
     def test_sanitizes_tracking_params(self):
         url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ&feature=share&utm_source=test"
@@ -141,6 +122,28 @@ class TestValidateUrl:
         assert "utm_source=" not in result.sanitized_url
         assert "v=abc123" in result.sanitized_url
 
+    def test_keeps_allowed_params_in_order(self):
+        url = "https://youtu.be/dQw4w9WgXcQ?si=tracking&t=42&list=PL123#comments"
+        result = validate_url(url)
+        assert result.is_valid is True
+        assert result.sanitized_url == "https://youtu.be/dQw4w9WgXcQ?t=42&list=PL123"
+
+    @pytest.mark.parametrize(
+        ("url", "expected"),
+        [
+            (
+                "https://www.youtube.com/watch?v=a b&feature=share",
+                "https://www.youtube.com/watch?v=a+b",
+            ),
+            (
+                "https://youtu.be/dQw4w9WgXcQ?%74=1<2&si=tracking",
+                "https://youtu.be/dQw4w9WgXcQ?t=1%3C2",
+            ),
+        ],
+    )
+    def test_reencodes_kept_params(self, url: str, expected: str):
+        assert validate_url(url).sanitized_url == expected
+
     def test_handles_url_with_whitespace(self):
         url = "  https://www.youtube.com/watch?v=dQw4w9WgXcQ  "
         result = validate_url(url)